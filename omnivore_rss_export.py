@@ -1,27 +1,133 @@
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import json
+import gzip
+import hashlib
+import time
 from typing import List, Dict, Optional
 from dataclasses import dataclass
 from datetime import datetime
+from functools import lru_cache, partial
+from itertools import groupby
 from dotenv import load_dotenv
 import os
+import xml.etree.ElementTree as ET
+import sys
 
-@dataclass
+try:
+    import orjson
+    _json_loads = orjson.loads
+except ImportError:  # orjson is optional; fall back to the stdlib parser
+    _json_loads = json.loads
+
+# The subscriptions field takes no first/after arguments: the whole list
+# comes back in a single response, so there are no pages to fetch.
+_GET_SUBSCRIPTIONS_QUERY = """
+query GetSubscriptions {
+    subscriptions {
+        ... on SubscriptionsSuccess {
+            subscriptions {
+                name
+                url
+                folder
+                createdAt
+                lastFetchedAt
+                description
+                newsletterEmail
+                refreshedAt
+                count
+                icon
+                isPrivate
+                autoAddToLibrary
+                fetchContent
+                failedAt
+            }
+        }
+    }
+}
+"""
+
+# The request body never changes, so serialize it once at import time
+_GET_SUBSCRIPTIONS_BODY = json.dumps({"query": _GET_SUBSCRIPTIONS_QUERY}).encode("utf-8")
+
+# (connect, read) timeouts in seconds for API requests
+_REQUEST_TIMEOUT = (5.0, 30.0)
+
+# Feeds last fetched within this many seconds of being created are treated
+# as never fetched by --exclude-unfetched
+_UNFETCHED_THRESHOLD_SECONDS = 60.0
+
+# Drops code points that are not allowed in XML 1.0; ElementTree escapes
+# markup characters itself but passes these through unchanged
+_XML_INVALID_CHARS = str.maketrans({
+    "\ufffe": None,
+    "\uffff": None,
+    **{chr(c): None for c in range(0x20) if c not in (0x9, 0xA, 0xD)},
+})
+
+@lru_cache(maxsize=4096)
+def _parse_dt(value: Optional[str]) -> Optional[datetime]:
+    """Parse an ISO-8601 timestamp from the API, caching repeated values."""
+    return datetime.fromisoformat(value) if value else None
+
+@dataclass(slots=True, frozen=True)
 class Subscription:
     name: str
     url: Optional[str] = None
     folder: Optional[str] = None
-    created_at: Optional[datetime] = None
-    last_fetched_at: Optional[datetime] = None
+    created_at_iso: Optional[str] = None
+    last_fetched_at_iso: Optional[str] = None
     description: Optional[str] = None
     newsletter_email: Optional[str] = None
-    refreshed_at: Optional[datetime] = None
+    refreshed_at_iso: Optional[str] = None
     count: Optional[int] = None
     icon: Optional[str] = None
     is_private: Optional[bool] = None
     auto_add_to_library: Optional[bool] = None
     fetch_content: Optional[bool] = None
-    failed_at: Optional[datetime] = None
+    failed_at_iso: Optional[str] = None
+
+    # Timestamps are kept as the API's ISO-8601 strings and only parsed when
+    # read, since the OPML export never looks at them
+    @property
+    def created_at(self) -> Optional[datetime]:
+        return _parse_dt(self.created_at_iso)
+
+    @property
+    def last_fetched_at(self) -> Optional[datetime]:
+        return _parse_dt(self.last_fetched_at_iso)
+
+    @property
+    def refreshed_at(self) -> Optional[datetime]:
+        return _parse_dt(self.refreshed_at_iso)
+
+    @property
+    def failed_at(self) -> Optional[datetime]:
+        return _parse_dt(self.failed_at_iso)
+
+def _sub_from_dict(sub: Dict) -> Subscription:
+    """Build a Subscription from a single GraphQL subscription record."""
+    # Folders and the newsletter inbox address repeat across many records;
+    # interning makes them share one string object
+    folder = sub.get("folder")
+    newsletter_email = sub.get("newsletterEmail")
+    return Subscription(
+        name=sub["name"],
+        url=sub.get("url"),
+        folder=sys.intern(folder) if folder else folder,
+        created_at_iso=sub.get("createdAt"),
+        last_fetched_at_iso=sub.get("lastFetchedAt"),
+        description=sub.get("description"),
+        newsletter_email=sys.intern(newsletter_email) if newsletter_email else newsletter_email,
+        refreshed_at_iso=sub.get("refreshedAt"),
+        count=sub.get("count"),
+        icon=sub.get("icon"),
+        is_private=sub.get("isPrivate"),
+        auto_add_to_library=sub.get("autoAddToLibrary"),
+        fetch_content=sub.get("fetchContent"),
+        failed_at_iso=sub.get("failedAt")
+    )
 
 class OmnivoreClient:
     def __init__(self, token: str, host: str, graphql_path: str):
@@ -32,55 +138,103 @@ class OmnivoreClient:
             "Authorization": token,  # No 'Bearer' prefix
             "Content-Type": "application/json",
         }
+        # Reuse one connection pool for every request made by this client
+        self._session = requests.Session()
+        self._session.headers.update(self.headers)
+        # The subscriptions query is read-only, so retrying the POST is safe
+        retry = Retry(
+            total=3,
+            backoff_factor=0.5,
+            status_forcelist=[502, 503, 504],
+            allowed_methods=["POST"],
+            raise_on_status=False,
+        )
+        self._session.mount("https://", HTTPAdapter(max_retries=retry))
+
+    def close(self) -> None:
+        """Close the underlying HTTP session."""
+        self._session.close()
+
+    def __enter__(self) -> "OmnivoreClient":
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.close()
 
-    def get_subscriptions(self) -> List[Subscription]:
+    def _cache_path(self) -> str:
+        """Path of the on-disk response cache for this host and token."""
+        cache_home = os.getenv("XDG_CACHE_HOME") or os.path.expanduser("~/.cache")
+        key = hashlib.blake2b(f"{self.token}{self.base_url}".encode("utf-8")).hexdigest()[:16]
+        return os.path.join(cache_home, "omnivore_export", f"subs-{key}.json")
+
+    def _read_cache(self, cache_ttl: float) -> Optional[bytes]:
+        """Return the cached response body if it is younger than cache_ttl seconds."""
+        path = self._cache_path()
+        try:
+            age = time.time() - os.path.getmtime(path)
+            # A negative age means the mtime is in the future (clock skew)
+            if age < 0 or age >= cache_ttl:
+                return None
+            with open(path, 'rb') as f:
+                return f.read()
+        except OSError:
+            return None
+
+    def _write_cache(self, content: bytes) -> None:
+        """Store a response body in the on-disk cache, warning on failure."""
+        path = self._cache_path()
+        tmp_path = f"{path}.tmp"
+        try:
+            # The cache holds the user's subscription list, so keep it private
+            os.makedirs(os.path.dirname(path), mode=0o700, exist_ok=True)
+            fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+            with open(fd, 'wb') as f:
+                f.write(content)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            print(f"Warning: could not write response cache: {e}")
+
+    def get_subscriptions(self, cache_ttl: float = 0) -> List[Subscription]:
         """
         Fetch all RSS subscriptions from Omnivore.
         
+        Args:
+            cache_ttl: Reuse a cached response younger than this many seconds.
+                0 disables the cache.
+
         Returns:
             List of Subscription objects
         """
-        query = """
-        query GetSubscriptions {
-            subscriptions {
-                ... on SubscriptionsSuccess {
-                    subscriptions {
-                        name
-                        url
-                        folder
-                        createdAt
-                        lastFetchedAt
-                        description
-                        newsletterEmail
-                        refreshedAt
-                        count
-                        icon
-                        isPrivate
-                        autoAddToLibrary
-                        fetchContent
-                        failedAt
-                    }
-                }
-            }
-        }
-        """
-        
+        data = None
+        content = self._read_cache(cache_ttl) if cache_ttl > 0 else None
+        from_cache = content is not None
+        if from_cache:
+            try:
+                data = _json_loads(content)
+                print(f"Using cached response from {self._cache_path()}")
+            except ValueError:
+                # A corrupt cache entry is a miss, not an error
+                print("Ignoring unreadable response cache")
+                content = None
+                from_cache = False
+
         try:
-            response = requests.post(
-                self.base_url,
-                headers=self.headers,
-                json={"query": query}
-            )
-            
-            # Print debug information
-            print(f"Status Code: {response.status_code}")
-            if response.status_code != 200:
-                print(f"Response Headers: {response.headers}")
-                print(f"Response Text: {response.text[:500]}...")
-            
-            response.raise_for_status()  # Raise an exception for bad status codes
-            
-            data = response.json()
+            if content is None:
+                response = self._session.post(
+                    self.base_url,
+                    data=_GET_SUBSCRIPTIONS_BODY,
+                    timeout=_REQUEST_TIMEOUT
+                )
+                
+                # Print debug information
+                print(f"Status Code: {response.status_code}")
+                if response.status_code != 200:
+                    print(f"Response Headers: {response.headers}")
+                    print(f"Response Text: {response.text[:500]}...")
+                
+                response.raise_for_status()  # Raise an exception for bad status codes
+                content = response.content
+                data = _json_loads(content)
             
             # Check for errors in the response
             if "errors" in data:
@@ -91,32 +245,11 @@ class OmnivoreClient:
             if "errorCodes" in result:
                 raise Exception(f"Subscription error: {result['errorCodes']}")
 
-            subscriptions = []
-            for sub in result["subscriptions"]:
-                created_at = datetime.fromisoformat(sub["createdAt"].replace("Z", "+00:00")) if sub.get("createdAt") else None
-                last_fetched_at = datetime.fromisoformat(sub["lastFetchedAt"].replace("Z", "+00:00")) if sub.get("lastFetchedAt") else None
-                refreshed_at = datetime.fromisoformat(sub["refreshedAt"].replace("Z", "+00:00")) if sub.get("refreshedAt") else None
-                failed_at = datetime.fromisoformat(sub["failedAt"].replace("Z", "+00:00")) if sub.get("failedAt") else None
-                
-                subscription = Subscription(
-                    name=sub["name"],
-                    url=sub.get("url"),
-                    folder=sub.get("folder"),
-                    created_at=created_at,
-                    last_fetched_at=last_fetched_at,
-                    description=sub.get("description"),
-                    newsletter_email=sub.get("newsletterEmail"),
-                    refreshed_at=refreshed_at,
-                    count=sub.get("count"),
-                    icon=sub.get("icon"),
-                    is_private=sub.get("isPrivate"),
-                    auto_add_to_library=sub.get("autoAddToLibrary"),
-                    fetch_content=sub.get("fetchContent"),
-                    failed_at=failed_at
-                )
-                subscriptions.append(subscription)
+            # Only successful responses are cached
+            if cache_ttl > 0 and not from_cache:
+                self._write_cache(content)
 
-            return subscriptions
+            return [_sub_from_dict(sub) for sub in result["subscriptions"]]
 
         except requests.exceptions.RequestException as e:
             print(f"Request failed: {str(e)}")
@@ -124,46 +257,84 @@ class OmnivoreClient:
                 print(f"Error response: {e.response.text}")
             raise
 
-    def export_to_opml(self, subscriptions: List[Subscription], filename: str) -> None:
+    def export_to_opml(self, subscriptions: List[Subscription], filename: str, compress: bool = False) -> None:
         """
         Export subscriptions to OPML format
         
         Args:
             subscriptions: List of Subscription objects
             filename: Output filename
+            compress: Write the file gzip-compressed
         """
-        opml = '<?xml version="1.0" encoding="UTF-8"?>\n'
-        opml += '<opml version="2.0">\n'
-        opml += '  <head>\n'
-        opml += f'    <title>Omnivore RSS Subscriptions Export - {datetime.now().strftime("%Y-%m-%d")}</title>\n'
-        opml += '  </head>\n'
-        opml += '  <body>\n'
-
-        # Group subscriptions by folder
-        folders: Dict[str, List[Subscription]] = {}
-        for sub in subscriptions:
-            folder = sub.folder or "Uncategorized"
-            if folder not in folders:
-                folders[folder] = []
-            folders[folder].append(sub)
-
-        # Write each folder and its subscriptions
-        for folder, subs in folders.items():
+        root = ET.Element("opml", version="2.0")
+        head = ET.SubElement(root, "head")
+        title = ET.SubElement(head, "title")
+        title.text = f"Omnivore RSS Subscriptions Export - {datetime.now().strftime('%Y-%m-%d')}"
+        body = ET.SubElement(root, "body")
+
+        # Sort named folders alphabetically, then the uncategorized feeds, so
+        # each folder is a contiguous run for groupby
+        subs_sorted = sorted(subscriptions, key=lambda s: (not s.folder, s.folder or ""))
+
+        # Add each folder and its subscriptions
+        for folder, subs in groupby(subs_sorted, key=lambda s: s.folder or "Uncategorized"):
+            parent = body
             if folder != "Uncategorized":
-                opml += f'    <outline text="{folder}" title="{folder}">\n'
-            
+                folder_text = folder.translate(_XML_INVALID_CHARS)
+                parent = ET.SubElement(body, "outline", text=folder_text, title=folder_text)
+
             for sub in subs:
                 if sub.url:  # Only include subscriptions with URLs
-                    opml += f'      <outline type="rss" text="{sub.name}" title="{sub.name}" xmlUrl="{sub.url}"/>\n'
-            
-            if folder != "Uncategorized":
-                opml += '    </outline>\n'
+                    name = sub.name.translate(_XML_INVALID_CHARS)
+                    ET.SubElement(parent, "outline", type="rss", text=name, title=name,
+                                  xmlUrl=sub.url.translate(_XML_INVALID_CHARS))
 
-        opml += '  </body>\n'
-        opml += '</opml>'
+        ET.indent(root, space="  ")
+        payload = ET.tostring(root, encoding="UTF-8", xml_declaration=True)
+        opener = partial(gzip.open, compresslevel=6) if compress else open
+        with opener(filename, 'wb') as f:
+            f.write(payload)
 
-        with open(filename, 'w', encoding='utf-8') as f:
-            f.write(opml)
+def _was_fetched(sub: Subscription) -> bool:
+    """Return True if the feed has been fetched since it was first added."""
+    # Check the raw strings first so records missing a timestamp skip parsing
+    if not sub.last_fetched_at_iso:
+        return False
+    if not sub.created_at_iso:
+        return True
+    # A fetch within a minute of creation is the initial subscribe, not a real fetch
+    return abs((sub.last_fetched_at - sub.created_at).total_seconds()) >= _UNFETCHED_THRESHOLD_SECONDS
+
+def _format_sub(sub: Subscription) -> str:
+    """Format a subscription's details for the console listing."""
+    lines = [f"\nName: {sub.name}"]
+    if sub.url:
+        lines.append(f"URL: {sub.url}")
+    if sub.folder:
+        lines.append(f"Folder: {sub.folder}")
+    if sub.description:
+        lines.append(f"Description: {sub.description}")
+    if sub.newsletter_email:
+        lines.append(f"Newsletter email: {sub.newsletter_email}")
+    if sub.created_at:
+        lines.append(f"Created at: {sub.created_at.strftime('%Y-%m-%d')}")
+    if sub.last_fetched_at:
+        lines.append(f"Last fetched at: {sub.last_fetched_at.strftime('%Y-%m-%d')}")
+    if sub.refreshed_at:
+        lines.append(f"Refreshed at: {sub.refreshed_at.strftime('%Y-%m-%d')}")
+    if sub.count is not None:
+        lines.append(f"Count: {sub.count}")
+    if sub.icon:
+        lines.append(f"Icon: {sub.icon}")
+    if sub.is_private is not None:
+        lines.append(f"Is private: {sub.is_private}")
+    if sub.auto_add_to_library is not None:
+        lines.append(f"Auto add to library: {sub.auto_add_to_library}")
+    if sub.fetch_content is not None:
+        lines.append(f"Fetch content: {sub.fetch_content}")
+    if sub.failed_at:
+        lines.append(f"Failed at: {sub.failed_at.strftime('%Y-%m-%d')}")
+    return "\n".join(lines) + "\n"
 
 def main():
     # Load environment variables from .env file
@@ -190,60 +361,36 @@ def main():
     parser = argparse.ArgumentParser(description='Export Omnivore RSS subscriptions to OPML')
     parser.add_argument('--exclude-unfetched', action='store_true', 
                       help='Exclude feeds that have never been fetched after creation')
+    parser.add_argument('--gzip', action='store_true',
+                      help='Write the OPML file gzip-compressed (.opml.gz)')
+    parser.add_argument('--cache-ttl', type=float, default=0, metavar='SECONDS',
+                      help='Reuse a cached API response younger than SECONDS (default: 0, no caching)')
     args = parser.parse_args()
     
     try:
-        client = OmnivoreClient(token, host, graphql_path)
-        print("Fetching subscriptions...")
-        subscriptions = client.get_subscriptions()
-        
-        # Filter out unfetched subscriptions if requested
-        if args.exclude_unfetched:
-            original_count = len(subscriptions)
-            subscriptions = [sub for sub in subscriptions if not (
-                sub.last_fetched_at is None or 
-                (sub.created_at and sub.last_fetched_at and 
-                 abs((sub.last_fetched_at - sub.created_at).total_seconds()) < 60)  # Within 1 minute
-            )]
-            filtered_count = original_count - len(subscriptions)
-            if filtered_count > 0:
-                print(f"\nFiltered out {filtered_count} never-fetched subscriptions")
+        with OmnivoreClient(token, host, graphql_path) as client:
+            print("Fetching subscriptions...")
+            subscriptions = client.get_subscriptions(cache_ttl=args.cache_ttl)
+            
+            # Filter out unfetched subscriptions if requested
+            if args.exclude_unfetched:
+                original_count = len(subscriptions)
+                subscriptions = [sub for sub in subscriptions if _was_fetched(sub)]
+                filtered_count = original_count - len(subscriptions)
+                if filtered_count > 0:
+                    print(f"\nFiltered out {filtered_count} never-fetched subscriptions")
         
-        # Print subscriptions
-        print(f"\nFound {len(subscriptions)} RSS subscriptions:")
-        for sub in subscriptions:
-            print(f"\nName: {sub.name}")
-            if sub.url:
-                print(f"URL: {sub.url}")
-            if sub.folder:
-                print(f"Folder: {sub.folder}")
-            if sub.description:
-                print(f"Description: {sub.description}")
-            if sub.newsletter_email:
-                print(f"Newsletter email: {sub.newsletter_email}")
-            if sub.created_at:
-                print(f"Created at: {sub.created_at.strftime('%Y-%m-%d')}")
-            if sub.last_fetched_at:
-                print(f"Last fetched at: {sub.last_fetched_at.strftime('%Y-%m-%d')}")
-            if sub.refreshed_at:
-                print(f"Refreshed at: {sub.refreshed_at.strftime('%Y-%m-%d')}")
-            if sub.count is not None:
-                print(f"Count: {sub.count}")
-            if sub.icon:
-                print(f"Icon: {sub.icon}")
-            if sub.is_private is not None:
-                print(f"Is private: {sub.is_private}")
-            if sub.auto_add_to_library is not None:
-                print(f"Auto add to library: {sub.auto_add_to_library}")
-            if sub.fetch_content is not None:
-                print(f"Fetch content: {sub.fetch_content}")
-            if sub.failed_at:
-                print(f"Failed at: {sub.failed_at.strftime('%Y-%m-%d')}")
+            # Print subscriptions
+            print(f"\nFound {len(subscriptions)} RSS subscriptions:")
+            # Build the whole listing first and write it in one call
+            sys.stdout.write("".join(_format_sub(sub) for sub in subscriptions))
         
-        # Export to OPML
-        output_file = f"omnivore_rss_export_{datetime.now().strftime('%Y%m%d')}.opml"
-        client.export_to_opml(subscriptions, output_file)
-        print(f"\nExported subscriptions to {output_file}")
+            # Export to OPML
+            output_file = f"omnivore_rss_export_{datetime.now().strftime('%Y%m%d')}.opml"
+            if args.gzip:
+                output_file += ".gz"
+            client.export_to_opml(subscriptions, output_file, compress=args.gzip)
+            print(f"\nExported subscriptions to {output_file}")
 
     except Exception as e:
         print(f"Error: {str(e)}")